@@ -0,0 +1,43 @@
+"""Compare the shared state backends against a plain per-process dict
+
+Run from the project root: python -m benchmarks.bench_shared_state
+"""
+import os
+import tempfile
+import time
+from utils.shared_state import LocalState, MmapState
+
+N = 100_000
+KEYS = [f"post:{i % 1000}:views" for i in range(N)]
+
+
+def bench(name, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {N / elapsed:>12,.0f} ops/s")
+
+
+def run_dict():
+    data = {}
+    bench("dict set", lambda: [data.__setitem__(k, {"n": 1}) for k in KEYS])
+    bench("dict get", lambda: [data.get(k) for k in KEYS])
+    counters = {}
+    bench("dict incr", lambda: [counters.__setitem__(k, counters.get(k, 0) + 1) for k in KEYS])
+
+
+def run_state(label, state):
+    bench(f"{label} set", lambda: [state.set(k, {"n": 1}) for k in KEYS])
+    bench(f"{label} get", lambda: [state.get(k) for k in KEYS])
+    for k in set(KEYS):
+        state.delete(k)
+    bench(f"{label} incr", lambda: [state.incr(k) for k in KEYS])
+
+
+if __name__ == "__main__":
+    run_dict()
+    run_state("LocalState", LocalState())
+    with tempfile.TemporaryDirectory() as directory:
+        state = MmapState(os.path.join(directory, "state"))
+        run_state("MmapState", state)
+        state.close()
@@ -18,6 +18,21 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "production"
     DEBUG: bool = False
     
+    # Compression & static files
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    STATIC_CACHE_MAX_AGE: int = 3600
+    
+    # Shared state between workers on one host ("mmap" or "local")
+    SHARED_STATE_BACKEND: str = "mmap"
+    SHARED_STATE_PATH: str = ""
+    SHARED_STATE_SLOTS: int = 4096
+    
+    # Profiling
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL: float = 0.001
+    PROFILE_BUFFER_SIZE: int = 50
+    PROFILE_DIR: str = ""
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -4,9 +4,15 @@ from sqlalchemy.orm import Session
 import models
 from database import get_db
 from utils.security import decode_access_token
+from utils.shared_state import SharedState, create_shared_state
+from config import settings
+import threading
 
 security = HTTPBearer()
 
+_shared_state = None
+_shared_state_lock = threading.Lock()
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -70,4 +76,19 @@ def get_pagination(page: int = 1, page_size: int = 10) -> Pagination:
         raise HTTPException(status_code=400, detail="Page size must be between 1 and 100")
     
     skip = (page - 1) * page_size
-    return Pagination(skip=skip, limit=page_size)
\ No newline at end of file
+    return Pagination(skip=skip, limit=page_size)
+
+def get_shared_state() -> SharedState:
+    """Cache and counter store shared by all workers on this host"""
+    global _shared_state
+    
+    with _shared_state_lock:
+        if _shared_state is None:
+            _shared_state = create_shared_state(
+                settings.SHARED_STATE_BACKEND,
+                path=settings.SHARED_STATE_PATH,
+                slots=settings.SHARED_STATE_SLOTS,
+                namespace=settings.DATABASE_URL
+            )
+    
+    return _shared_state
\ No newline at end of file
@@ -1,8 +1,8 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import time
 import logging
 from pathlib import Path
@@ -11,6 +11,10 @@ from database import engine
 from routers import auth, users, posts, admin
 from exceptions import AppException
 from config import settings
+from utils import profiling
+from utils.static_assets import StaticAssetStore
+from utils.compression import CompressionMiddleware
+from utils.security import shutdown_hash_pool
 
 # Create database tables
 
@@ -50,6 +54,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (lists) for clients that accept gzip
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Static files are served from memory, precompressed; rescanned on change in dev
+static_assets = StaticAssetStore("static", reload=settings.DEBUG or settings.ENVIRONMENT == "development")
+
 
 # Request timing middleware
 @app.middleware("http")
@@ -60,6 +70,28 @@ async def add_process_time_header(request: Request, call_next):
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
+# On-demand profiling middleware (admin header or random sampling)
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    wants_profile = request.headers.get(profiling.PROFILE_HEADER) and await run_in_threadpool(
+        profiling.is_admin_token, request.headers.get("Authorization")
+    )
+    
+    if not (wants_profile or profiling.should_sample()):
+        return await call_next(request)
+    
+    profile = profiling.start_profile(request.method, request.url.path)
+    status_code = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        profiling.finish_profile(profile, status_code)
+        await run_in_threadpool(profiling.save_profile, profile)
+    
+    response.headers["X-Profile-Id"] = profile.id
+    return response
+
 # Custom exception handler
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
@@ -67,13 +99,27 @@ async def app_exception_handler(request: Request, exc: AppException):
         status_code=exc.status_code,
         content={"error": exc.__class__.__name__, "message": exc.message}
     )
-@app.get("/", response_class=HTMLResponse)
-def serve_frontend():
-    html_path = Path("static/index.html")
-    return html_path.read_text()
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse, include_in_schema=False)
+def serve_frontend(request: Request):
+    response = static_assets.response(request, "index.html", cache_control="no-cache")
+    
+    if response is None:
+        raise HTTPException(status_code=404, detail="Frontend not found")
+    
+    return response
+
+# Static files
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def serve_static(path: str, request: Request):
+    response = static_assets.response(
+        request, path, cache_control=f"public, max-age={settings.STATIC_CACHE_MAX_AGE}"
+    )
+    
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    return response
 
 # Include routers
 app.include_router(auth.router)
@@ -90,7 +136,9 @@ def health_check():
 @app.on_event("startup")
 async def startup_event():
     logger.info("🚀 Application starting up...")
+    static_assets.load()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("👋 Application shutting down...")
\ No newline at end of file
+    logger.info("👋 Application shutting down...")
+    shutdown_hash_pool()
\ No newline at end of file
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from typing import Optional
 import models
 from database import get_db
 from dependencies import get_current_admin
+from schemas.admin import UserImportResult
+from utils.security import hash_passwords, get_hash_pool
+from utils import profiling
+from utils.bulk_import import detect_format, iter_csv_rows, iter_ndjson_rows, iter_chunks, parse_user, find_duplicates
+
+IMPORT_CHUNK_SIZE = 1000
 
 router = APIRouter(
     prefix="/admin",
@@ -58,4 +68,124 @@ def admin_delete_post(post_id: int, db: Session = Depends(get_db)):
     db.delete(post)
     db.commit()
     
-    return {"message": "Post deleted by admin"}
\ No newline at end of file
+    return {"message": "Post deleted by admin"}
+
+@router.post("/users/import", response_model=UserImportResult)
+def admin_import_users(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Bulk-create users from a CSV or NDJSON upload"""
+    file_format = file_format or detect_format(file.filename, file.content_type)
+    
+    if file_format == "csv":
+        rows = iter_csv_rows(file.file)
+    elif file_format == "ndjson":
+        rows = iter_ndjson_rows(file.file)
+    else:
+        raise HTTPException(status_code=400, detail="Upload must be CSV or NDJSON")
+    
+    total_rows = 0
+    created = 0
+    errors = {}
+    taken_usernames = set()
+    taken_emails = set()
+    
+    for chunk in iter_chunks(rows, IMPORT_CHUNK_SIZE):
+        total_rows += len(chunk)
+        
+        users = []
+        for row_number, record in chunk:
+            user, error = parse_user(record)
+            if error:
+                errors[row_number] = error
+            else:
+                users.append((row_number, user))
+        
+        if not users:
+            continue
+        
+        usernames = [user.username for _, user in users]
+        emails = [user.email for _, user in users]
+        existing = db.query(models.User.username, models.User.email).filter(
+            or_(models.User.username.in_(usernames), models.User.email.in_(emails))
+        ).all()
+        taken_usernames.update(username for username, _ in existing)
+        taken_emails.update(email for _, email in existing)
+        
+        duplicates = find_duplicates(users, taken_usernames, taken_emails)
+        errors.update(duplicates)
+        users = [(row_number, user) for row_number, user in users if row_number not in duplicates]
+        
+        password_hashes = hash_passwords([user.password for _, user in users], get_hash_pool())
+        mappings = [
+            {
+                "username": user.username,
+                "email": user.email,
+                "password_hash": password_hash,
+                "full_name": user.full_name
+            }
+            for (_, user), password_hash in zip(users, password_hashes)
+        ]
+        
+        created += _insert_users(db, users, mappings, errors)
+    
+    return {
+        "total_rows": total_rows,
+        "created": created,
+        "failed": len(errors),
+        "errors": [{"row": row, "error": error} for row, error in sorted(errors.items())]
+    }
+
+def _insert_users(db: Session, users, mappings, errors) -> int:
+    """Insert a batch of users, falling back to row-by-row if the batch conflicts"""
+    if not mappings:
+        return 0
+    
+    try:
+        db.execute(insert(models.User), mappings)
+        db.commit()
+        return len(mappings)
+    except IntegrityError:
+        db.rollback()
+    
+    created = 0
+    for (row_number, _), mapping in zip(users, mappings):
+        try:
+            db.execute(insert(models.User), [mapping])
+            db.commit()
+            created += 1
+        except IntegrityError:
+            db.rollback()
+            errors[row_number] = "Username or email already registered"
+    return created
+
+@router.get("/profiles")
+def admin_list_profiles():
+    """List recently captured request profiles, newest first"""
+    return profiling.list_profiles()
+
+@router.get("/profiles/{profile_id}")
+def admin_get_profile(profile_id: str):
+    """Get the timing breakdown and SQL statements of a profile"""
+    profile = profiling.get_profile(profile_id)
+    
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    profile.pop("collapsed", None)
+    return profile
+
+@router.get("/profiles/{profile_id}/flamegraph", response_class=PlainTextResponse)
+def admin_download_flamegraph(profile_id: str):
+    """Download a profile as folded stacks for flamegraph.pl or speedscope"""
+    profile = profiling.get_profile(profile_id)
+    
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return PlainTextResponse(
+        profile["collapsed"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class UserImportResult(BaseModel):
+    total_rows: int
+    created: int
+    failed: int
+    errors: List[ImportRowError]
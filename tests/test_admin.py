@@ -0,0 +1,142 @@
+import os
+import signal
+import uuid
+from fastapi.testclient import TestClient
+import main
+import models
+from database import SessionLocal
+from routers import admin
+from utils.security import create_access_token, get_hash_pool, hash_passwords, verify_password
+
+client = TestClient(main.app)
+
+
+def admin_headers():
+    """Create an admin account and return auth headers for it"""
+    suffix = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    admin = models.User(
+        username=f"admin_{suffix}",
+        email=f"admin_{suffix}@example.com",
+        password_hash="not-used",
+        full_name="Admin",
+        is_admin=True
+    )
+    db.add(admin)
+    db.commit()
+    token = create_access_token({"user_id": admin.id, "username": admin.username})
+    db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_import_users_reports_row_errors():
+    """Bulk import creates valid rows and reports invalid or duplicate ones"""
+    suffix = uuid.uuid4().hex[:8]
+    csv_body = (
+        "username,email,password,full_name\n"
+        f"alice_{suffix},alice_{suffix}@example.com,password123,Alice\n"
+        f"bob_{suffix},bob_{suffix}@example.com,password123,Bob\n"
+        f"alice_{suffix},other_{suffix}@example.com,password123,Alice Again\n"
+        f"x,bad-email,short,Broken\n"
+    )
+    resp = client.post(
+        "/admin/users/import",
+        files={"file": ("users.csv", csv_body, "text/csv")},
+        headers=admin_headers()
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total_rows"] == 4
+    assert body["created"] == 2
+    assert [e["row"] for e in body["errors"]] == [3, 4]
+    assert body["errors"][0]["error"] == "Username already registered"
+
+
+def test_import_users_ndjson_skips_existing_accounts():
+    """Rows matching accounts already in the database are rejected"""
+    suffix = uuid.uuid4().hex[:8]
+    line = f'{{"username": "carol_{suffix}", "email": "carol_{suffix}@example.com", "password": "password123", "full_name": "Carol"}}\n'
+    headers = admin_headers()
+
+    first = client.post("/admin/users/import", files={"file": ("users.ndjson", line)}, headers=headers)
+    second = client.post("/admin/users/import", files={"file": ("users.ndjson", line + "{not json\n")}, headers=headers)
+
+    assert first.json()["created"] == 1
+    assert second.json()["created"] == 0
+    assert [e["row"] for e in second.json()["errors"]] == [1, 2]
+
+
+def test_import_users_extra_columns_is_row_error():
+    """A row with more fields than the header fails on its own, not the whole import"""
+    suffix = uuid.uuid4().hex[:8]
+    csv_body = (
+        "username,email,password,full_name\n"
+        f"dave_{suffix},dave_{suffix}@example.com,password123,Dave,EXTRA\n"
+        f"erin_{suffix},erin_{suffix}@example.com,password123,Erin\n"
+    )
+    resp = client.post(
+        "/admin/users/import",
+        files={"file": ("users.csv", csv_body, "text/csv")},
+        headers=admin_headers()
+    )
+    assert resp.status_code == 200
+    assert resp.json()["created"] == 1
+    assert resp.json()["errors"] == [{"row": 1, "error": "Row has more columns than the header"}]
+
+
+def test_import_users_reports_rows_before_invalid_utf8(monkeypatch):
+    """A bad byte mid-file ends the import with a row error, keeping earlier rows"""
+    monkeypatch.setattr(admin, "IMPORT_CHUNK_SIZE", 2)
+    suffix = uuid.uuid4().hex[:8]
+    good = "".join(f"u{i}_{suffix},u{i}_{suffix}@example.com,password123,U{i}\n" for i in range(3))
+    csv_body = f"username,email,password,full_name\n{good}".encode() + b"bad\xff,x@example.com,password123,X\n"
+    resp = client.post(
+        "/admin/users/import",
+        files={"file": ("users.csv", csv_body, "text/csv")},
+        headers=admin_headers()
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["created"] == 3
+    assert [e["row"] for e in body["errors"]] == [4]
+    assert "UTF-8" in body["errors"][0]["error"]
+
+
+def test_broken_hash_pool_is_replaced():
+    """If a pool worker dies, hashing falls back in-process and the pool is rebuilt"""
+    pool = get_hash_pool()
+    pool.submit(os.getpid).result()
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+
+    hashes = hash_passwords(["password123", "password456"], pool)
+    assert verify_password("password123", hashes[0])
+    assert get_hash_pool() is not pool
+
+
+def test_import_users_requires_admin():
+    """Non-admin requests to the import endpoint should be rejected"""
+    resp = client.post("/admin/users/import", files={"file": ("users.csv", "")})
+    assert resp.status_code in (401, 403)
+
+
+def test_profile_header_captures_request():
+    """Admins sending the profile header get a downloadable profile"""
+    headers = admin_headers()
+    resp = client.get("/admin/dashboard", headers={**headers, "X-Profile": "1"})
+    profile_id = resp.headers["X-Profile-Id"]
+
+    detail = client.get(f"/admin/profiles/{profile_id}", headers=headers).json()
+    assert detail["path"] == "/admin/dashboard"
+    assert detail["query_count"] >= 4
+    assert any("count" in q["statement"].lower() for q in detail["queries"])
+
+    flamegraph = client.get(f"/admin/profiles/{profile_id}/flamegraph", headers=headers)
+    assert flamegraph.status_code == 200
+    assert "attachment" in flamegraph.headers["content-disposition"]
+
+
+def test_profile_header_ignored_for_non_admins():
+    """The profile header has no effect without admin credentials"""
+    resp = client.get("/health", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in resp.headers
@@ -0,0 +1,63 @@
+import contextvars
+import threading
+import time
+from config import settings
+from utils import profiling
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def _busy_in(context, stop):
+    context.run(_busy, stop)
+
+
+def test_sampler_keeps_only_this_requests_threads():
+    """Threads running outside the request's context are not sampled"""
+    stop = threading.Event()
+    unrelated = threading.Thread(target=_busy, args=(stop,))
+    unrelated.start()
+
+    profile = profiling.start_profile("GET", "/test")
+    request_worker = threading.Thread(target=_busy_in, args=(contextvars.copy_context(), stop))
+    request_worker.start()
+    time.sleep(0.05)
+    profiling.finish_profile(profile, 200)
+    stop.set()
+    unrelated.join()
+    request_worker.join()
+
+    stacks = profile.samples.keys()
+    assert any("_busy_in" in stack for stack in stacks)
+    assert all("_busy_in" in stack for stack in stacks if "_busy (" in stack)
+
+
+def test_profiles_are_spooled_for_all_workers(tmp_path, monkeypatch):
+    """Saved profiles are read back from disk, newest first, capped at the buffer size"""
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_BUFFER_SIZE", 2)
+
+    ids = []
+    for _ in range(3):
+        profile = profiling.start_profile("GET", "/spooled")
+        profiling.finish_profile(profile, 200)
+        profiling.save_profile(profile)
+        ids.append(profile.id)
+        time.sleep(0.01)
+
+    assert [p["id"] for p in profiling.list_profiles()] == ids[:0:-1]
+    assert profiling.get_profile(ids[0]) is None
+    assert profiling.get_profile(ids[-1])["path"] == "/spooled"
+    assert profiling.get_profile("../../etc/passwd") is None
+
+
+def test_sampling_skipped_while_a_profile_runs(monkeypatch):
+    """Random sampling never starts a second profile in the same worker"""
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+    assert profiling.should_sample() is True
+
+    profile = profiling.start_profile("GET", "/busy")
+    assert profiling.should_sample() is False
+    profiling.finish_profile(profile, 200)
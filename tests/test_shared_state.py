@@ -0,0 +1,126 @@
+import multiprocessing
+import time
+import pytest
+from utils.shared_state import LocalState, MmapState, SharedStateFull, SharedStateLayoutError, create_shared_state
+
+
+def _incr_many(path, n):
+    state = MmapState(path, slots=256, stripes=16)
+    for _ in range(n):
+        state.incr("hits")
+    state.close()
+
+
+def test_get_set_delete_and_ttl(tmp_path):
+    """Both backends support the same get/set/delete/ttl behaviour"""
+    for state in (LocalState(), MmapState(str(tmp_path / "state"), slots=256, stripes=16)):
+        assert state.get("missing", "default") == "default"
+        state.set("post:1", {"title": "Hello", "tags": ["a"]})
+        assert state.get("post:1") == {"title": "Hello", "tags": ["a"]}
+        state.set("short", "lived", ttl=0.05)
+        time.sleep(0.1)
+        assert state.get("short") is None
+        assert state.delete("post:1") is True
+        assert state.get("post:1") is None
+
+
+def test_incr_counts(tmp_path):
+    """Counters start at zero and accumulate"""
+    state = MmapState(str(tmp_path / "state"), slots=256, stripes=16)
+    assert state.incr("views:1") == 1
+    assert state.incr("views:1", 5) == 6
+    assert state.get("views:1") == 6
+
+
+def test_full_stripe_evicts_instead_of_failing(tmp_path):
+    """Writing more keys than slots keeps the newest entries readable"""
+    state = MmapState(str(tmp_path / "state"), slots=16, stripes=4)
+    for i in range(100):
+        state.set(f"key:{i}", i)
+    assert state.get("key:99") == 99
+
+
+def test_counters_shared_across_processes(tmp_path):
+    """Increments from several processes all land in one counter"""
+    path = str(tmp_path / "state")
+    MmapState(path, slots=256, stripes=16).close()
+    workers = [multiprocessing.Process(target=_incr_many, args=(path, 500)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert MmapState(path, slots=256, stripes=16).get("hits") == 2000
+
+
+def test_mismatched_layout_is_rejected_without_touching_file(tmp_path):
+    """Opening an in-use file with another layout fails instead of truncating it"""
+    path = str(tmp_path / "state")
+    first = MmapState(path, slots=4096)
+    first.set("kept", "value")
+
+    with pytest.raises(SharedStateLayoutError):
+        MmapState(path, slots=256, stripes=16)
+
+    assert first.get("kept") == "value"
+
+
+def test_layouts_get_separate_files(tmp_path):
+    """Different slot counts map to different files under the same base path"""
+    base = str(tmp_path / "state")
+    large = create_shared_state("mmap", path=base, slots=4096)
+    small = create_shared_state("mmap", path=base, slots=256, stripes=16)
+    large.set("k", 1)
+    assert small.get("k") is None
+    assert large.path != small.path
+
+
+def test_oversized_values_and_long_keys(tmp_path):
+    """Big values are skipped rather than failing; long keys still work"""
+    state = MmapState(str(tmp_path / "state"), slots=256, stripes=16)
+    state.set("post:1", "old")
+    assert state.set("post:1", "x" * 10_000) is False
+    assert state.get("post:1") is None
+
+    long_key = "feed:" + "y" * 200
+    assert state.set(long_key, [1, 2, 3]) is True
+    assert state.get(long_key) == [1, 2, 3]
+
+
+def test_incr_overflow_leaves_counter_unchanged(tmp_path):
+    """Counters past the int64 range raise OverflowError on both backends"""
+    for state in (LocalState(), MmapState(str(tmp_path / "state"), slots=256, stripes=16)):
+        state.incr("c", 2**62)
+        state.incr("c", 2**62 - 1)
+        with pytest.raises(OverflowError):
+            state.incr("c", 1)
+        assert state.get("c") == 2**63 - 1
+
+
+def test_cache_writes_never_evict_counters(tmp_path):
+    """Filling the table with set() leaves existing counters intact"""
+    state = MmapState(str(tmp_path / "state"), slots=16, stripes=4)
+    for _ in range(10):
+        state.incr("ratelimit:1.2.3.4")
+    for i in range(2000):
+        state.set(f"cache:post:{i}", {"id": i})
+    assert state.get("ratelimit:1.2.3.4") == 10
+    assert state.incr("ratelimit:1.2.3.4") == 11
+
+
+def test_stripe_full_of_counters_refuses_new_entries(tmp_path):
+    """Without an evictable slot, set() reports False and incr() raises"""
+    state = MmapState(str(tmp_path / "state"), slots=4, stripes=1)
+    for i in range(4):
+        state.incr(f"counter:{i}")
+    assert state.set("cache:x", "value") is False
+    with pytest.raises(SharedStateFull):
+        state.incr("counter:new")
+    assert [state.get(f"counter:{i}") for i in range(4)] == [1, 1, 1, 1]
+
+
+def test_set_int_then_incr(tmp_path):
+    """An int stored with set() can be incremented on both backends"""
+    for state in (LocalState(), MmapState(str(tmp_path / "state"), slots=256, stripes=16)):
+        state.set("n", 5)
+        assert state.incr("n", 2) == 7
+        assert state.get("n") == 7
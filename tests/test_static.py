@@ -0,0 +1,89 @@
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+import main
+from utils.compression import CompressionMiddleware
+
+client = TestClient(main.app)
+
+
+def test_frontend_served_compressed_with_etag():
+    """The frontend is served precompressed with a strong ETag"""
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["etag"].startswith('"')
+    assert "<html" in resp.text
+
+
+def test_frontend_not_modified_when_etag_matches():
+    """A matching If-None-Match returns 304 without a body"""
+    etag = client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    resp = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+
+def test_static_missing_file_returns_404():
+    """Unknown static paths, including encoded traversal attempts, are not found"""
+    assert client.get("/static/missing.js").status_code == 404
+    resp = client.get("/static/%2e%2e/main.py")
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "Not Found"}
+
+
+def test_frontend_head_returns_headers_only():
+    """HEAD is allowed and sends no body"""
+    resp = client.head("/", headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == 200
+    assert resp.content == b""
+    assert int(resp.headers["content-length"]) > 0
+    assert client.head("/static/index.html").status_code == 200
+
+
+def test_weak_if_none_match_returns_304():
+    """If-None-Match uses weak comparison, so W/ tags still match"""
+    etag = client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    resp = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": f"W/{etag}"})
+    assert resp.status_code == 304
+
+
+def test_refused_gzip_is_not_recompressed():
+    """gzip;q=0 gets the identity body with its own ETag and a single Vary"""
+    identity = client.get("/", headers={"Accept-Encoding": "identity"})
+    resp = client.get("/", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["etag"] == identity.headers["etag"]
+    assert resp.headers["vary"].lower().count("accept-encoding") == 1
+
+
+def test_range_request_returns_partial_content():
+    """A single byte range is served as 206"""
+    resp = client.get("/static/index.html", headers={"Accept-Encoding": "identity", "Range": "bytes=0-14"})
+    assert resp.status_code == 206
+    assert resp.content == b"<!DOCTYPE html>"
+    assert resp.headers["content-range"].startswith("bytes 0-14/")
+
+
+def test_large_json_is_compressed():
+    """Large JSON responses are gzipped when the client accepts it"""
+    resp = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.json()["info"]["title"] == "Blog API"
+    plain = client.get("/openapi.json", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_compressed_json_gets_its_own_etag():
+    """Compressing a JSON response that has an ETag suffixes the tag"""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+    @app.get("/items")
+    def items():
+        return JSONResponse(list(range(100)), headers={"ETag": '"items-v1"'})
+
+    compressed = TestClient(app).get("/items", headers={"Accept-Encoding": "gzip"})
+    plain = TestClient(app).get("/items", headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["etag"] == '"items-v1-gzip"'
+    assert plain.headers["etag"] == '"items-v1"'
@@ -0,0 +1,124 @@
+import codecs
+import csv
+import json
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from schemas.auth import UserRegister
+
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+Row = Tuple[int, Any]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Guess the upload format from its content type or file extension"""
+    if content_type in CSV_TYPES:
+        return "csv"
+    if content_type in NDJSON_TYPES:
+        return "ndjson"
+
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+class UndecodableRow(Exception):
+    """Marks the row where the upload stopped being valid UTF-8"""
+
+
+def iter_lines(stream: IO[bytes]) -> Iterator[str]:
+    """Decode an upload line by line so a bad byte is pinned to its own line"""
+    for index, raw in enumerate(stream):
+        if index == 0 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        yield raw.decode("utf-8")
+
+
+def iter_csv_rows(stream: IO[bytes]) -> Iterator[Row]:
+    """Yield (row number, record) pairs from a CSV upload with a header line
+
+    Decoding stops at the first invalid UTF-8 line, which is yielded as an
+    UndecodableRow; nothing after it is read.
+    """
+    reader = csv.DictReader(iter_lines(stream))
+    row_number = 0
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            yield row_number + 1, UndecodableRow()
+            return
+        row_number += 1
+        yield row_number, record
+
+
+def iter_ndjson_rows(stream: IO[bytes]) -> Iterator[Row]:
+    """Yield (row number, record) pairs from a newline-delimited JSON upload"""
+    row_number = 0
+    lines = iter_lines(stream)
+    while True:
+        try:
+            line = next(lines)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            yield row_number + 1, UndecodableRow()
+            return
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, exc
+
+
+def iter_chunks(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    """Group rows into lists of at most `size` items"""
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_user(record: Any) -> Tuple[Optional[UserRegister], Optional[str]]:
+    """Validate a raw record, returning the user or a readable error"""
+    if isinstance(record, UndecodableRow):
+        return None, "Invalid UTF-8; this and all following rows were not imported"
+    if isinstance(record, json.JSONDecodeError):
+        return None, f"Invalid JSON: {record.msg}"
+    if not isinstance(record, dict):
+        return None, "Row must be an object"
+    if None in record:
+        return None, "Row has more columns than the header"
+
+    try:
+        return UserRegister.model_validate(record), None
+    except ValidationError as exc:
+        first = exc.errors()[0]
+        field = ".".join(str(part) for part in first["loc"]) or "row"
+        return None, f"{field}: {first['msg']}"
+
+
+def find_duplicates(users: List[Tuple[int, UserRegister]], taken_usernames: set, taken_emails: set) -> Dict[int, str]:
+    """Flag rows whose username or email is already taken, claiming the rest"""
+    errors = {}
+    for row_number, user in users:
+        if user.username in taken_usernames:
+            errors[row_number] = "Username already registered"
+        elif user.email in taken_emails:
+            errors[row_number] = "Email already registered"
+        else:
+            taken_usernames.add(user.username)
+            taken_emails.add(user.email)
+    return errors
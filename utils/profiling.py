@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import Context, ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from config import settings
+from database import SessionLocal, engine
+from dependencies import get_current_user, get_current_admin
+from utils.shared_state import default_state_path
+
+PROFILE_HEADER = "X-Profile"
+APP_ROOT = str(Path(__file__).resolve().parent.parent)
+
+PROFILE_ID = re.compile(r"^\d+-[0-9a-f]{12}$")
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+_active_profiles = 0
+_active_lock = threading.Lock()
+
+
+def profile_dir() -> Path:
+    """Spool directory shared by every worker of this app on the host"""
+    return Path(settings.PROFILE_DIR or default_state_path(settings.DATABASE_URL) + "-profiles")
+
+
+def _is_app_file(filename: str) -> bool:
+    return filename.startswith(APP_ROOT) and "site-packages" not in filename and filename != __file__
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_ROOT):
+        filename = filename[len(APP_ROOT) + 1:]
+    else:
+        filename = "/".join(Path(filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Sampling profiler plus SQL log for a single request
+
+    A background thread snapshots stacks at a fixed interval. It keeps the
+    event-loop thread that started the request, plus any threadpool thread
+    that is currently running a call in this request's context. Those are
+    recognised by a frame holding the copied Context (anyio's worker keeps
+    it in a local named `context`) whose current_profile is this profile.
+    Only stacks touching application code are recorded. Async code of
+    other requests sharing the event loop can still appear.
+    """
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self.loop_ident = threading.get_ident()
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.status_code = None
+        self.started_at = datetime.now(timezone.utc)
+        self.duration = 0.0
+        self.samples = Counter()
+        self.queries = []
+        self._start = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self, status_code: Optional[int]):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+        self.status_code = status_code
+
+    def _runs_for_this_request(self, frame) -> bool:
+        while frame is not None:
+            if "context" in frame.f_code.co_varnames:
+                context = frame.f_locals.get("context")
+                if isinstance(context, Context) and context.get(current_profile) is self:
+                    return True
+            frame = frame.f_back
+        return False
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if ident != self.loop_ident and not self._runs_for_this_request(frame):
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    in_app = in_app or _is_app_file(frame.f_code.co_filename)
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if in_app:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def record_query(self, statement: str, duration: float):
+        self.queries.append({"statement": statement, "duration_ms": round(duration * 1000, 3)})
+
+    def summary(self) -> dict:
+        sql_time = sum(q["duration_ms"] for q in self.queries)
+        total = round(self.duration * 1000, 3)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": total,
+            "sql_ms": round(sql_time, 3),
+            "other_ms": round(max(total - sql_time, 0.0), 3),
+            "query_count": len(self.queries),
+            "sample_count": sum(self.samples.values())
+        }
+
+    def detail(self) -> dict:
+        return {**self.summary(), "queries": self.queries}
+
+    def to_record(self) -> dict:
+        return {**self.detail(), "collapsed": self.collapsed()}
+
+    def collapsed(self) -> str:
+        """Render samples in the folded-stack format used by flamegraph tools"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def is_admin_token(authorization: Optional[str]) -> bool:
+    """Check whether an Authorization header belongs to an active admin"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    db = SessionLocal()
+    try:
+        credentials = HTTPAuthorizationCredentials(scheme=scheme, credentials=token)
+        get_current_admin(get_current_user(credentials, db))
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+def should_sample() -> bool:
+    """Randomly pick requests to profile, but only while no other profile runs in this worker"""
+    if settings.PROFILE_SAMPLE_RATE <= 0 or random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return False
+    return _active_profiles == 0
+
+
+def start_profile(method: str, path: str) -> RequestProfile:
+    global _active_profiles
+
+    profile = RequestProfile(method, path, settings.PROFILE_INTERVAL)
+    with _active_lock:
+        _active_profiles += 1
+    current_profile.set(profile)
+    profile.start()
+    return profile
+
+
+def finish_profile(profile: RequestProfile, status_code: Optional[int]):
+    global _active_profiles
+
+    profile.stop(status_code)
+    current_profile.set(None)
+    with _active_lock:
+        _active_profiles -= 1
+
+
+def save_profile(profile: RequestProfile):
+    """Spool a finished profile where every worker can read it, keeping the newest PROFILE_BUFFER_SIZE"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(profile.to_record(), f)
+    os.replace(tmp_path, directory / f"{profile.id}.json")
+
+    for stale in _spooled_files(directory)[settings.PROFILE_BUFFER_SIZE:]:
+        stale.unlink(missing_ok=True)
+
+
+def _spooled_files(directory: Path) -> list:
+    """Spooled profiles, newest first"""
+    files = []
+    for path in directory.glob("*.json"):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    return [path for _, path in sorted(files, key=lambda item: item[0], reverse=True)]
+
+
+def _load(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    """Load a spooled profile written by any worker"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    return _load(profile_dir() / f"{profile_id}.json")
+
+
+def list_profiles() -> list:
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+
+    summaries = []
+    for path in _spooled_files(directory):
+        record = _load(path)
+        if record is not None:
+            record.pop("queries", None)
+            record.pop("collapsed", None)
+            summaries.append(record)
+    return summaries
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.record_query(statement, time.perf_counter() - starts.pop())
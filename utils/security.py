@@ -1,7 +1,11 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from typing import Optional
+from typing import List, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
 import os
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -9,11 +13,59 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     return pwd_context.hash(password[:72])
 
+def hash_passwords(passwords: List[str], pool: Optional[Executor] = None) -> List[str]:
+    """Hash many passwords, spreading the work across a process pool if given"""
+    if pool is None or len(passwords) < 2:
+        return [hash_password(p) for p in passwords]
+    
+    chunksize = max(1, len(passwords) // (HASH_POOL_WORKERS * 4))
+    try:
+        return list(pool.map(hash_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool and finish this batch here
+        discard_hash_pool(pool)
+        return [hash_password(p) for p in passwords]
+
+def get_hash_pool() -> Executor:
+    """Shared process pool for bulk password hashing, created on first use"""
+    global _hash_pool
+    
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn rather than fork: the app process is multi-threaded
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=HASH_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _hash_pool
+
+def discard_hash_pool(pool: Executor):
+    """Forget a broken pool so the next get_hash_pool() starts a fresh one"""
+    global _hash_pool
+    
+    with _hash_pool_lock:
+        if _hash_pool is pool:
+            _hash_pool = None
+    pool.shutdown(wait=False)
+
+def shutdown_hash_pool():
+    """Stop the hashing pool's worker processes, if any were started"""
+    global _hash_pool
+    
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown()
+            _hash_pool = None
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password[:72], hashed_password)
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; fall back to LocalState
+    fcntl = None
+
+MAGIC = b"BLGSTATE"
+HEADER = struct.Struct("<8sQII")
+HEADER_SIZE = 64
+
+# state, kind, key length, value length, key hash, expiry (0 = never)
+SLOT_HEADER = struct.Struct("<BBHIQd")
+COUNTER = struct.Struct("<q")
+COUNTER_MIN, COUNTER_MAX = -2**63, 2**63 - 1
+MAX_KEY_SIZE = 64
+
+EMPTY, USED, DELETED = 0, 1, 2
+KIND_JSON, KIND_COUNTER = 0, 1
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SharedStateLayoutError(RuntimeError):
+    """The state file on disk was created with a different table layout"""
+
+
+class SharedStateFull(RuntimeError):
+    """No slot could be found for a counter without evicting another counter"""
+
+
+class SharedState(ABC):
+    """Key/value store with counters shared by the workers on a host"""
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value for `key`, or `default` if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store a JSON-serialisable value; returns False if it was too large to cache"""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Add to a 64-bit counter and return the new value
+
+        Raises OverflowError, leaving the counter unchanged, if the result
+        doesn't fit in a signed 64-bit integer, and SharedStateFull if the
+        backend has no room left for a new counter.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Remove a key; returns whether it existed"""
+
+
+def _check_counter(key: str, value: int) -> int:
+    if not COUNTER_MIN <= value <= COUNTER_MAX:
+        raise OverflowError(f"Counter {key!r} out of 64-bit range")
+    return value
+
+
+class LocalState(SharedState):
+    """In-process backend; state is not shared between workers"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires and expires <= time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else 0.0)
+            return True
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value, expires = self._data.get(key, (0, 0.0))
+            if expires and expires <= time.time():
+                value, expires = 0, 0.0
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise TypeError(f"Value for {key!r} is not a counter")
+            value = _check_counter(key, value + amount)
+            self._data[key] = (value, expires)
+            return value
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+
+class MmapState(SharedState):
+    """Fixed-size hash table in a memory-mapped file
+
+    The table is split into stripes, each a contiguous run of slots guarded
+    by its own lock: a thread lock inside the process plus an fcntl byte-range
+    lock across processes. A key only ever probes the slots of its own
+    stripe, so one lock covers every read and write for it.
+
+    When a stripe is full, cached values (from `set`) are evicted to make
+    room, but counters (from `incr`) never are: a `set` that finds only
+    counters returns False, and an `incr` that can't get a slot raises
+    SharedStateFull rather than silently restarting from zero.
+
+    Keys longer than MAX_KEY_SIZE bytes are stored under a digest. Values
+    that don't fit in a slot are not cached and `set` returns False.
+
+    A new (empty) file is initialised in place. An existing file with a
+    different layout is never resized, since other processes may have it
+    mapped; SharedStateLayoutError is raised instead.
+    """
+
+    def __init__(self, path: str, slots: int = 4096, slot_size: int = 512, stripes: int = 64):
+        if fcntl is None:
+            raise RuntimeError("MmapState requires fcntl (POSIX)")
+        if slots % stripes:
+            raise ValueError("slots must be a multiple of stripes")
+
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.stripes = stripes
+        self.slots_per_stripe = slots // stripes
+        self.max_value_size = slot_size - SLOT_HEADER.size - MAX_KEY_SIZE
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+
+        size = HEADER_SIZE + slots * slot_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, slots, slot_size, stripes), 0)
+            else:
+                header = os.pread(self._fd, HEADER.size, 0)
+                if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, slots, slot_size, stripes):
+                    raise SharedStateLayoutError(
+                        f"{path} has a different layout than slots={slots}, "
+                        f"slot_size={slot_size}, stripes={stripes}"
+                    )
+            self._mm = mmap.mmap(self._fd, size)
+        except Exception:
+            os.close(self._fd)
+            raise
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+    def _locate(self, key: str):
+        key_bytes = key.encode()
+        if len(key_bytes) > MAX_KEY_SIZE:
+            # the leading NUL keeps digests from colliding with real short keys
+            key_bytes = b"\0" + hashlib.blake2b(key_bytes, digest_size=MAX_KEY_SIZE // 2 - 1).digest()
+        key_hash = int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+        return key_bytes, key_hash, key_hash % self.stripes
+
+    @contextmanager
+    def _lock(self, stripe: int):
+        with self._thread_locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _offsets(self, key_hash: int, stripe: int):
+        first = stripe * self.slots_per_stripe
+        home = (key_hash // self.stripes) % self.slots_per_stripe
+        for i in range(self.slots_per_stripe):
+            yield HEADER_SIZE + (first + (home + i) % self.slots_per_stripe) * self.slot_size
+
+    def _find(self, key_bytes: bytes, key_hash: int, stripe: int):
+        """Return (offset of the live entry or None, offset to insert at or None)
+
+        Free, deleted and expired slots are preferred for inserts; failing
+        that, the first cached value in probe order is evicted. Counters are
+        never chosen.
+        """
+        now = time.time()
+        free = None
+        evictable = None
+        for offset in self._offsets(key_hash, stripe):
+            state, kind, key_len, value_len, slot_hash, expires = SLOT_HEADER.unpack_from(self._mm, offset)
+            if state == EMPTY:
+                return None, free if free is not None else offset
+            if state == USED and slot_hash == key_hash:
+                start = offset + SLOT_HEADER.size
+                if self._mm[start:start + key_len] == key_bytes:
+                    if expires and expires <= now:
+                        self._mm[offset] = DELETED
+                        return None, free if free is not None else offset
+                    return offset, offset
+            if free is None and (state == DELETED or (expires and expires <= now)):
+                free = offset
+            elif evictable is None and state == USED and kind == KIND_JSON:
+                evictable = offset
+        return None, free if free is not None else evictable
+
+    def _read(self, offset: int) -> Any:
+        _, kind, key_len, value_len, _, _ = SLOT_HEADER.unpack_from(self._mm, offset)
+        start = offset + SLOT_HEADER.size + MAX_KEY_SIZE
+        if kind == KIND_COUNTER:
+            return COUNTER.unpack_from(self._mm, start)[0]
+        return json.loads(self._mm[start:start + value_len])
+
+    def _write(self, offset: int, key_bytes: bytes, key_hash: int, kind: int, payload: bytes, expires: float):
+        start = offset + SLOT_HEADER.size
+        self._mm[start:start + len(key_bytes)] = key_bytes
+        self._mm[start + MAX_KEY_SIZE:start + MAX_KEY_SIZE + len(payload)] = payload
+        SLOT_HEADER.pack_into(self._mm, offset, USED, kind, len(key_bytes), len(payload), key_hash, expires)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        key_bytes, key_hash, stripe = self._locate(key)
+        with self._lock(stripe):
+            offset, _ = self._find(key_bytes, key_hash, stripe)
+            return default if offset is None else self._read(offset)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        if len(payload) > self.max_value_size:
+            # Too big to cache; drop any stale copy so readers don't see it
+            self.delete(key)
+            return False
+
+        key_bytes, key_hash, stripe = self._locate(key)
+        with self._lock(stripe):
+            _, offset = self._find(key_bytes, key_hash, stripe)
+            if offset is None:
+                return False
+            self._write(offset, key_bytes, key_hash, KIND_JSON, payload, time.time() + ttl if ttl else 0.0)
+            return True
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        key_bytes, key_hash, stripe = self._locate(key)
+        with self._lock(stripe):
+            found, offset = self._find(key_bytes, key_hash, stripe)
+            if found is None:
+                if offset is None:
+                    raise SharedStateFull(f"No free slot for counter {key!r}")
+                self._write(offset, key_bytes, key_hash, KIND_COUNTER, COUNTER.pack(_check_counter(key, amount)), 0.0)
+                return amount
+
+            start = offset + SLOT_HEADER.size + MAX_KEY_SIZE
+            if self._mm[offset + 1] != KIND_COUNTER:
+                # A plain int stored with set() becomes a counter on first incr
+                value = self._read(offset)
+                if not isinstance(value, int) or isinstance(value, bool):
+                    raise TypeError(f"Value for {key!r} is not a counter")
+                value = _check_counter(key, value + amount)
+                expires = SLOT_HEADER.unpack_from(self._mm, offset)[5]
+                self._write(offset, key_bytes, key_hash, KIND_COUNTER, COUNTER.pack(value), expires)
+                return value
+
+            value = _check_counter(key, COUNTER.unpack_from(self._mm, start)[0] + amount)
+            COUNTER.pack_into(self._mm, start, value)
+            return value
+
+    def delete(self, key: str) -> bool:
+        key_bytes, key_hash, stripe = self._locate(key)
+        with self._lock(stripe):
+            offset, _ = self._find(key_bytes, key_hash, stripe)
+            if offset is None:
+                return False
+            self._mm[offset] = DELETED
+            return True
+
+
+def default_state_path(namespace: str) -> str:
+    """Pick a RAM-backed location when the host has one, unique to this app instance"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    instance = hashlib.blake2b(f"{APP_ROOT}|{namespace}".encode(), digest_size=6).hexdigest()
+    return os.path.join(directory, f"blog_api_state-{instance}")
+
+
+def create_shared_state(
+    backend: str,
+    path: str = "",
+    slots: int = 4096,
+    slot_size: int = 512,
+    stripes: int = 64,
+    namespace: str = ""
+) -> SharedState:
+    """Build the configured backend
+
+    The layout is part of the file name, so workers started with different
+    settings (e.g. during a rolling deploy) use separate files rather than
+    fighting over one.
+    """
+    if backend == "local" or fcntl is None:
+        return LocalState()
+    if backend == "mmap":
+        base = path or default_state_path(namespace)
+        return MmapState(f"{base}-{slots}-{slot_size}-{stripes}", slots=slots, slot_size=slot_size, stripes=stripes)
+    raise ValueError(f"Unknown shared state backend: {backend}")
@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import mimetypes
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from utils.compression import negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class StaticAsset:
+    """A static file held in memory along with its precompressed variants"""
+
+    def __init__(self, path: Path, content: bytes, mtime: float):
+        self.path = path
+        self.mtime = mtime
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.etag = hashlib.sha256(content).hexdigest()[:32]
+        self.encodings = {"identity": content}
+
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            self.encodings["gzip"] = compressed
+
+        if brotli is not None:
+            compressed = brotli.compress(content, quality=11)
+            if len(compressed) < len(content):
+                self.encodings["br"] = compressed
+
+    def etag_for(self, encoding: str) -> str:
+        if encoding == "identity":
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+
+class StaticAssetStore:
+    """Serves files from a directory out of memory
+
+    Files are read and compressed once. With `reload` enabled the directory
+    is rescanned (at most once per second) so edits show up without a
+    restart.
+    """
+
+    def __init__(self, directory: str, reload: bool = False):
+        self.directory = Path(directory)
+        self.reload = reload
+        self.assets: Dict[str, StaticAsset] = {}
+        self._loaded = False
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            self._scan()
+
+    def _scan(self):
+        found = {}
+        for path in self.directory.rglob("*"):
+            if not path.is_file():
+                continue
+            key = path.relative_to(self.directory).as_posix()
+            mtime = path.stat().st_mtime
+            asset = self.assets.get(key)
+            if asset is None or asset.mtime != mtime:
+                asset = StaticAsset(path, path.read_bytes(), mtime)
+            found[key] = asset
+
+        self.assets = found
+        self._loaded = True
+        self._last_scan = time.monotonic()
+
+    def get(self, name: str) -> Optional[StaticAsset]:
+        if not self._loaded or (self.reload and time.monotonic() - self._last_scan > RELOAD_CHECK_INTERVAL):
+            with self._lock:
+                if not self._loaded or (self.reload and time.monotonic() - self._last_scan > RELOAD_CHECK_INTERVAL):
+                    self._scan()
+        return self.assets.get(name)
+
+    def response(self, request: Request, name: str, cache_control: str) -> Optional[Response]:
+        """Build a response for an asset, or None if it doesn't exist"""
+        asset = self.get(name)
+        if asset is None:
+            return None
+
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""), asset.encodings)
+        etag = asset.etag_for(encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+            "Accept-Ranges": "bytes"
+        }
+
+        # If-None-Match uses weak comparison (RFC 9110 13.1.2)
+        if_none_match = request.headers.get("If-None-Match", "")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if if_none_match.strip() == "*" or etag in tags:
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = asset.encodings[encoding]
+        status_code = 200
+
+        byte_range = request.headers.get("Range")
+        if byte_range and request.headers.get("If-Range", etag) == etag:
+            span = parse_range(byte_range, len(body))
+            if span is None:
+                headers["Content-Range"] = f"bytes */{len(body)}"
+                return Response(status_code=416, headers=headers)
+            if span != (0, len(body) - 1):
+                start, end = span
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                body = body[start:end + 1]
+                status_code = 206
+
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            body = b""
+        return Response(body, status_code=status_code, media_type=asset.media_type, headers=headers)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=" range into inclusive offsets
+
+    Returns None when the range can't be satisfied. Malformed or
+    multi-range headers are ignored by returning the whole body.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return 0, size - 1
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return 0, size - 1
+
+    if end < start:
+        return 0, size - 1
+    if start >= size:
+        return None
+    return start, min(end, size - 1)